@@ -1,16 +1,32 @@
+import csv
 import os
+import tempfile
+import threading
+import time
 from flask import Flask, render_template, request, redirect, url_for, session
+import numpy as np
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from http.client import RemoteDisconnected
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = pacsv = None
+
 # ==============================================================================
 # --- 1. APP & DATA INITIALIZATION ---
 # ==============================================================================
 app = Flask(__name__)
-app.secret_key = 'your_very_secret_key'
+app.secret_key = os.environ.get('FLASK_SECRET_KEY')
+if not app.secret_key:
+    print("WARNING: FLASK_SECRET_KEY is not set. Using a random key, so sessions will not survive a restart.")
+    app.secret_key = os.urandom(24)
 
 try:
     df_login = pd.read_csv('login.csv')
@@ -19,6 +35,16 @@ except FileNotFoundError:
     print("FATAL ERROR: 'login.csv' or 'clients.csv' not found. Please ensure they are in the project folder.")
     exit()
 
+# username -> {'password', 'role', 'client_name'}, so a login is one dict lookup
+_LOGIN_INDEX = df_login.drop_duplicates('username').set_index('username')[['password', 'role', 'client_name']].to_dict('index')
+
+# Lookups over clients.csv built once at startup. Lists keep the file's order for
+# navigation menus; the per-client booth sets back the access checks.
+all_locations = df_clients['location'].unique().tolist()
+client_to_locations = df_clients.groupby('client_name', sort=False)['location'].apply(lambda s: s.unique().tolist()).to_dict()
+loc_to_booths = df_clients.groupby('location', sort=False)['booth'].apply(lambda s: s.unique().tolist()).to_dict()
+client_loc_to_booths = df_clients.groupby(['client_name', 'location'])['booth'].apply(set).to_dict()
+
 # ==============================================================================
 # --- 2. GOOGLE SHEETS API CONFIGURATION ---
 # ==============================================================================
@@ -34,74 +60,415 @@ try:
 except Exception as e:
     print(f"WARNING: Could not connect to Google Sheets. Live data will be unavailable. Details: {e}")
 
+# The sheet only changes at sensor cadence, so one fetch is shared by every
+# request for SHEET_CACHE_TTL seconds.
+SHEET_CACHE_TTL = 30
+_SHEET_CACHE = {'df': None, 'ts': 0.0, 'refreshing': False}
+_SHEET_LOCK = threading.Lock()
+_SHEET_FETCH_LOCK = threading.Lock()
+
 # ==============================================================================
 # --- 3. HELPER FUNCTIONS ---
 # ==============================================================================
 
-def get_data_from_sheet():
+def fetch_sheet_data():
     if not worksheet: return None
     try:
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
+        # One values_get call returns the raw 2D grid; unformatted values keep
+        # numbers numeric while dates still come back as readable strings.
+        raw = worksheet.spreadsheet.values_get(
+            f"'{worksheet.title}'",
+            params={'valueRenderOption': 'UNFORMATTED_VALUE', 'dateTimeRenderOption': 'FORMATTED_STRING'}
+        ).get('values', [])
+        if not raw: return None
+        header, *rows = raw
+        # Cells beyond the header (e.g. a stray note) would make the frame constructor raise
+        df = pd.DataFrame([row[:len(header)] for row in rows], columns=header)
         if 'time' in df.columns:
             df['time'] = pd.to_datetime(df['time'], errors='coerce')
-        return df.sort_values(by='time', ascending=True).reset_index(drop=True)
+        # Ordering is left to prepare_sensor_frame, which skips the sort for an append-only sheet.
+        return df
     except Exception as e:
         print(f"Error fetching data from Google Sheet: {e}")
         return None
 
-def load_sensor_data(loc_name, booth_name):
+def refresh_sheet_cache():
+    df = fetch_sheet_data()
+    with _SHEET_LOCK:
+        if df is not None:
+            _SHEET_CACHE['df'], _SHEET_CACHE['ts'] = df, time.monotonic()
+    return df
+
+def _background_sheet_refresh():
+    # Only the refresh that set the 'refreshing' flag clears it; direct callers
+    # such as the cache refresher timer leave it alone.
+    try:
+        refresh_sheet_cache()
+    finally:
+        with _SHEET_LOCK:
+            _SHEET_CACHE['refreshing'] = False
+
+def get_data_from_sheet():
     """
-    Hybrid function to load data, handle missing columns, and enforce numeric types.
+    Returns the live sheet, cached for SHEET_CACHE_TTL seconds. A stale entry is
+    served while a background thread refreshes it; only a cold cache blocks.
+    """
+    if not worksheet: return None
+    with _SHEET_LOCK:
+        df = _SHEET_CACHE['df']
+        if df is not None and time.monotonic() - _SHEET_CACHE['ts'] >= SHEET_CACHE_TTL and not _SHEET_CACHE['refreshing']:
+            _SHEET_CACHE['refreshing'] = True
+            threading.Thread(target=_background_sheet_refresh, daemon=True).start()
+    if df is not None:
+        return df
+
+    # Cold cache: one request does the round-trip while concurrent ones wait for its result
+    with _SHEET_FETCH_LOCK:
+        if _SHEET_CACHE['df'] is None:
+            refresh_sheet_cache()
+        return _SHEET_CACHE['df']
+
+# Narrow storage types shared by every source. CO2 stays float32 rather than a
+# nullable integer so missing readings remain NaN instead of pd.NA.
+SENSOR_DTYPES = {'temp_c': 'float32', 'humidity_pct': 'float32', 'co2_ppm': 'float32', 'pir_state': 'category'}
+
+def prepare_sensor_frame(df):
+    """
+    Handles missing columns, enforces numeric/datetime types, narrows them to
+    SENSOR_DTYPES and sorts by time. Columns that already carry the right dtype
+    (e.g. from Parquet) are left untouched.
     """
-    df = None
     required_cols = ['time', 'temp_c', 'humidity_pct', 'co2_ppm', 'pir_state']
-    
+
+    # Step 1: Ensure all required columns exist, filling with None if missing
+    for col in required_cols:
+        if col not in df.columns:
+            df[col] = None
+
+    # --- THIS IS THE CRUCIAL FIX ---
+    # Step 2: Convert all sensor reading columns to a numeric type.
+    # 'errors='coerce'' will turn any non-numeric values (like empty strings) into NaN.
+    numeric_cols = [col for col in ['temp_c', 'humidity_pct', 'co2_ppm'] if not pd.api.types.is_numeric_dtype(df[col])]
+    if numeric_cols:
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+    # --- END OF FIX ---
+
+    # Step 3: Ensure the 'time' column is always a datetime object
+    if not pd.api.types.is_datetime64_any_dtype(df['time']):
+        df['time'] = pd.to_datetime(df['time'], errors='coerce')
+
+    # Step 4: Narrow to float32 readings and a categorical PIR state
+    narrow = {col: dtype for col, dtype in SENSOR_DTYPES.items() if df[col].dtype != dtype}
+    if narrow:
+        df = df.astype(narrow)
+
+    # Sort by time to ensure the last row is the latest reading (append-only sources already are)
+    if df['time'].is_monotonic_increasing:
+        return df.reset_index(drop=True)
+    return df.sort_values(by='time').reset_index(drop=True)
+
+def read_sensor_csv(filepath):
+    """
+    Parses a booth CSV with pyarrow's multithreaded reader when it is installed,
+    falling back to pandas' C engine.
+    """
+    if pacsv is not None:
+        convert_options = pacsv.ConvertOptions(
+            column_types={'temp_c': pa.float32(), 'humidity_pct': pa.float32(), 'co2_ppm': pa.float32()},
+            timestamp_parsers=[pacsv.ISO8601, '%Y-%m-%d %H:%M:%S']
+        )
+        return pacsv.read_csv(filepath, convert_options=convert_options).to_pandas()
+
+    # pir_state is categorised afterwards so its categories keep the parsed value
+    # type; read_csv would turn them into strings.
+    csv_dtypes = {col: dtype for col, dtype in SENSOR_DTYPES.items() if dtype != 'category'}
+    return pd.read_csv(filepath, dtype=csv_dtypes, parse_dates=['time'], engine='c')
+
+def read_sensor_file(filepath, mtime):
+    """
+    Reads a booth CSV, reusing its Parquet sibling when that is up to date.
+    After a CSV parse the prepared frame is written back as Parquet.
+    """
+    parquet_path = os.path.splitext(filepath)[0] + '.parquet'
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= mtime:
+        try:
+            # Files written before a dtype change are brought up to date here
+            return prepare_sensor_frame(pd.read_parquet(parquet_path))
+        except Exception as e:
+            print(f"Error reading {parquet_path}, falling back to CSV: {e}")
+
+    try:
+        df = read_sensor_csv(filepath)
+    except ValueError:
+        # Malformed readings or no 'time' column; prepare_sensor_frame coerces them instead.
+        df = pd.read_csv(filepath)
+    if df.empty:
+        return None
+    df = prepare_sensor_frame(df)
+
+    # Write to a temp file next to the sidecar and swap it in atomically, so a
+    # concurrent reader (or another worker writing too) never sees a partial file.
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(parquet_path), suffix='.parquet.tmp')
+        os.close(fd)
+        df.to_parquet(tmp_path)
+        # Stamp the copy with the CSV's mtime so a write racing this parse still invalidates it.
+        os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, parquet_path)
+    except Exception as e:
+        print(f"WARNING: Could not write Parquet cache {parquet_path}. Details: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
+
+def is_sheet_booth(loc_name, booth_name):
     # Standardize booth name for comparison
-    clean_booth_name = booth_name.replace(' ', '')
-    
-    if loc_name == 'Adelaide' and clean_booth_name == 'BoothA':
-        df = get_data_from_sheet()
+    return loc_name == 'Adelaide' and booth_name.replace(' ', '') == 'BoothA'
+
+def sensor_filepath(loc_name, booth_name):
+    return os.path.join('data', f"{loc_name.replace(' ', '')}_{booth_name.replace(' ', '')}.csv")
+
+# Dashboard KPI payloads per (location, booth), rebuilt only when _load_booth_data
+# loads a new version of that booth's data.
+_KPI_CACHE = {}
+
+KPI_WINDOW = 24
+# Rolling (timestamp, 'HH:MM') pairs per (location, booth), so a reload only
+# formats the readings appended since the last one.
+_KPI_TIME_LABELS = {}
+
+def count_pir_states(pir_state):
+    """
+    Counts each PIR state in a Series, skipping missing readings, with NumPy
+    rather than value_counts. Categorical data is counted straight from its codes.
+    Like value_counts, the result is ordered by descending count, which sets the
+    slice order of the occupancy chart.
+    """
+    if isinstance(pir_state.dtype, pd.CategoricalDtype):
+        codes = pir_state.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(pir_state.cat.categories))
+        pairs = [(state, count) for state, count in zip(pir_state.cat.categories.tolist(), counts.tolist()) if count]
     else:
-        filepath = os.path.join('data', f"{loc_name.replace(' ', '')}_{clean_booth_name}.csv")
-        if os.path.exists(filepath):
-            try:
-                df = pd.read_csv(filepath)
-            except Exception as e:
-                print(f"Error reading {filepath}: {e}")
-                return None
-    
-    if df is not None and not df.empty:
-        # Step 1: Ensure all required columns exist, filling with None if missing
-        for col in required_cols:
-            if col not in df.columns:
-                df[col] = None
-        
-        # --- THIS IS THE CRUCIAL FIX ---
-        # Step 2: Convert all sensor reading columns to a numeric type.
-        # 'errors='coerce'' will turn any non-numeric values (like empty strings) into NaN.
-        numeric_cols = ['temp_c', 'humidity_pct', 'co2_ppm']
-        for col in numeric_cols:
-            # Check if column exists before trying to convert it
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        # --- END OF FIX ---
-            
-        # Step 3: Ensure the 'time' column is always a datetime object
-        if 'time' in df.columns:
-            df['time'] = pd.to_datetime(df['time'], errors='coerce')
-        
-        # Sort by time to ensure the last row is the latest reading
-        return df.sort_values(by='time').reset_index(drop=True)
-        
-    return None
+        try:
+            keys, counts = np.unique(pir_state.dropna().to_numpy(), return_counts=True)
+            pairs = list(zip(keys.tolist(), counts.tolist()))
+        except TypeError:
+            # Mixed value types (e.g. blank sheet cells next to numbers) can't be sorted by np.unique
+            return pir_state.value_counts().to_dict()
+    return dict(sorted(pairs, key=lambda pair: pair[1], reverse=True))
+
+def kpi_time_labels(key, times):
+    """
+    Returns 'HH:MM' labels for the KPI window, reusing this booth's previously
+    formatted labels when the new window only extends them.
+    """
+    window = _KPI_TIME_LABELS.get(key)
+    if window:
+        candidate = deque(window, maxlen=KPI_WINDOW)
+        candidate.extend((ts, ts.strftime('%H:%M')) for ts in times[times > window[-1][0]])
+        if [ts for ts, _ in candidate] == times.tolist():
+            _KPI_TIME_LABELS[key] = candidate
+            return [label for _, label in candidate]
+
+    # First load, or the data no longer just extends the window: format it all
+    window = deque(zip(times.tolist(), times.dt.strftime('%H:%M').tolist()), maxlen=KPI_WINDOW)
+    _KPI_TIME_LABELS[key] = window
+    return [label for _, label in window]
+
+def build_kpi_data(loc_name, booth_name, df):
+    recent_data = df.tail(KPI_WINDOW)
+    occupancy_counts = count_pir_states(recent_data['pir_state'])
+    return {
+        'temp_labels': kpi_time_labels((loc_name, booth_name), recent_data['time']),
+        # Widen before rounding so float32 storage doesn't leak 23.899999618... into the charts
+        'temp_values': recent_data['temp_c'].astype('float64').round(2).tolist(),
+        'humidity_values': recent_data['humidity_pct'].astype('float64').round(2).tolist(),
+        'occupancy_counts': occupancy_counts
+    }
+
+# Prepared frames per (location, booth), stored as (version, df) so only the
+# current version of each booth's data is kept and every route shares it.
+_FRAME_CACHE = {}
+
+def _load_booth_data(loc_name, booth_name, version):
+    """
+    Loads and prepares one booth's data. `version` is the CSV's mtime or the
+    sheet's fetch time.
+    """
+    df = None
+    if is_sheet_booth(loc_name, booth_name):
+        df_sheet = get_data_from_sheet()
+        if df_sheet is not None and not df_sheet.empty:
+            # Copy first: the cached sheet frame is shared with the TTL cache
+            df = prepare_sensor_frame(df_sheet.copy())
+    else:
+        filepath = sensor_filepath(loc_name, booth_name)
+        try:
+            df = read_sensor_file(filepath, version)
+        except Exception as e:
+            print(f"Error reading {filepath}: {e}")
+
+    if df is not None:
+        _KPI_CACHE[(loc_name, booth_name)] = build_kpi_data(loc_name, booth_name, df)
+    else:
+        _KPI_CACHE.pop((loc_name, booth_name), None)
+    return df
+
+def load_sensor_data(loc_name, booth_name):
+    """
+    Hybrid function to load data, handle missing columns, and enforce numeric types.
+    Results are memoized per source version, so callers must not mutate the
+    returned frame.
+    """
+    if is_sheet_booth(loc_name, booth_name):
+        if get_data_from_sheet() is None:
+            return None
+        version = _SHEET_CACHE['ts']
+    else:
+        filepath = sensor_filepath(loc_name, booth_name)
+        if not os.path.exists(filepath):
+            return None
+        version = os.path.getmtime(filepath)
+
+    key = (loc_name, booth_name)
+    cached = _FRAME_CACHE.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    df = _load_booth_data(loc_name, booth_name, version)
+    _FRAME_CACHE[key] = (version, df)
+    return df
+
+# Latest reading per (location, booth), so the dashboard never has to parse a
+# whole file just to look at its last row. _LATEST_MTIMES records which CSV
+# version each entry was read from.
+_LATEST_CACHE = {}
+_LATEST_MTIMES = {}
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def read_last_csv_row(filepath):
+    """
+    Returns the final complete row of an append-only CSV as a dict, reading only
+    the header line and the last 4KB of the file. Returns None if there are no
+    complete data rows.
+    """
+    with open(filepath, 'rb') as f:
+        header_line = f.readline()
+        data_start = f.tell()
+        end = f.seek(0, os.SEEK_END)
+        window_start = max(data_start, end - 4096)
+        f.seek(window_start)
+        segments = f.read().split(b'\n')
+
+    # Whatever follows the last newline is a row the sensor is still writing (or
+    # empty), and a window starting mid-file begins with a cut-off line.
+    segments.pop()
+    if window_start > data_start:
+        segments = segments[1:]
+    lines = [line for line in segments if line.strip()]
+    if not lines:
+        return None
+
+    header = next(csv.reader([header_line.decode('utf-8-sig').strip()]))
+    values = next(csv.reader([lines[-1].decode('utf-8').strip()]))
+    row = dict(zip(header, values))
+    for col in ['temp_c', 'humidity_pct', 'co2_ppm']:
+        row[col] = _to_float(row.get(col))
+    row['time'] = pd.to_datetime(row.get('time'), errors='coerce')
+    return row
+
+def _read_latest_csv_row(filepath):
+    try:
+        return read_last_csv_row(filepath)
+    except Exception as e:
+        print(f"Error reading latest row of {filepath}: {e}")
+        return None
+
+def refresh_latest():
+    """
+    Brings _LATEST_CACHE up to date for every booth in clients.csv. CSVs are only
+    re-read when their mtime changes; the sheet booth uses the cached sheet frame.
+    """
+    sheet_keys = []
+    stale_files = {}
+    for loc_name, booths in loc_to_booths.items():
+        for booth_name in booths:
+            key = (loc_name, booth_name)
+            if is_sheet_booth(loc_name, booth_name):
+                sheet_keys.append(key)
+                continue
+
+            filepath = sensor_filepath(loc_name, booth_name)
+            if not os.path.exists(filepath):
+                _LATEST_CACHE.pop(key, None)
+                _LATEST_MTIMES.pop(key, None)
+                continue
 
+            mtime = os.path.getmtime(filepath)
+            if _LATEST_MTIMES.get(key) != mtime:
+                stale_files[key] = (filepath, mtime)
 
-def get_locations(df_clients, client_name=None):
+    # Changed CSVs are read on worker threads while this thread handles the sheet
+    # booth, which on a cold cache is a Google round-trip, so the wait is the
+    # slowest source rather than the sum of all of them.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {key: executor.submit(_read_latest_csv_row, filepath) for key, (filepath, _) in stale_files.items()}
+        for key in sheet_keys:
+            df = load_sensor_data(*key)
+            if df is not None:
+                _LATEST_CACHE[key] = df.iloc[-1].to_dict()
+            else:
+                _LATEST_CACHE.pop(key, None)
+
+    for key, future in futures.items():
+        row = future.result()
+        if row is not None:
+            _LATEST_CACHE[key] = row
+        else:
+            _LATEST_CACHE.pop(key, None)
+        _LATEST_MTIMES[key] = stale_files[key][1]
+
+# Just under SHEET_CACHE_TTL, so requests keep finding a fresh sheet entry
+CACHE_REFRESH_INTERVAL = 25
+
+def warm_caches():
+    """
+    Primes every data cache: the sheet fetch, each booth's frame (and with it
+    the KPI payloads) and the latest-reading index.
+    """
+    for loc_name, booths in loc_to_booths.items():
+        for booth_name in booths:
+            load_sensor_data(loc_name, booth_name)
+    refresh_latest()
+
+def start_cache_refresher(interval=CACHE_REFRESH_INTERVAL):
+    """
+    Refetches the sheet and re-warms the caches every `interval` seconds on a
+    daemon timer, so requests don't block on I/O once the app is up.
+    """
+    def _tick():
+        try:
+            refresh_sheet_cache()
+            warm_caches()
+        except Exception as e:
+            print(f"Error refreshing caches: {e}")
+        start_cache_refresher(interval)
+
+    timer = threading.Timer(interval, _tick)
+    timer.daemon = True
+    timer.start()
+
+
+def get_locations(client_name=None):
     if client_name:
-        return df_clients[df_clients['client_name'] == client_name]['location'].unique().tolist()
+        return list(client_to_locations.get(client_name, []))
     else:
-        return df_clients['location'].unique().tolist()
+        return list(all_locations)
 
 # ==============================================================================
 # --- 4. FLASK ROUTES ---
@@ -112,11 +479,11 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = str(request.form['password'])
-        user_data = df_login[(df_login['username'] == username) & (df_login['password'] == password)]
-        if not user_data.empty:
-            session['username'] = user_data.iloc[0]['username']
-            session['role'] = user_data.iloc[0]['role']
-            session['client_name'] = user_data.iloc[0]['client_name']
+        user_data = _LOGIN_INDEX.get(username)
+        if user_data is not None and user_data['password'] == password:
+            session['username'] = username
+            session['role'] = user_data['role']
+            session['client_name'] = user_data['client_name']
             return redirect(url_for('dashboard'))
         else:
             return render_template('login.html', error="Invalid credentials")
@@ -132,72 +499,61 @@ def dashboard():
     if 'username' not in session: return redirect(url_for('login'))
     
     client_name = session.get('client_name')
-    locations = get_locations(df_clients, client_name if session.get('role') == 'client' else None)
+    locations = get_locations(client_name if session.get('role') == 'client' else None)
     
-    active_alerts = []
-    system_status = []
-    
-    location_summaries = {}
-    for loc in locations:
-        alert_count = 0
-        booths_in_loc = df_clients[df_clients['location'] == loc]['booth'].unique().tolist()
-        for booth_name in booths_in_loc:
-            df_booth = load_sensor_data(loc, booth_name)
-            if df_booth is not None and not df_booth.empty:
-                latest = df_booth.iloc[-1]
-                co2_val = latest.get('co2_ppm')
-                temp_val = latest.get('temp_c')
-                if (co2_val is not None and co2_val > 1000) or (temp_val is not None and temp_val > 25):
-                    alert_count += 1
-        location_summaries[loc] = alert_count
-
-         # 1. Logic for Active Alerts Log
-    co2_val, temp_val = latest.get('co2_ppm'), latest.get('temp_c')
-    if (co2_val is not None and co2_val > 1000):
-         active_alerts.append(f"High CO₂ in {loc}, {booth_name}: {int(co2_val)} ppm")
-    if (temp_val is not None and temp_val > 25):
-         active_alerts.append(f"High Temp in {loc}, {booth_name}: {temp_val}°C")
+    refresh_latest()
+    booth_list = [(loc, booth_name) for loc in locations
+                  for booth_name in loc_to_booths.get(loc, [])]
+
+    # One row per booth holding its latest reading; booths without data get NaN/NaT
+    latest_df = pd.DataFrame(
+        [{'location': loc, 'booth': booth_name, **_LATEST_CACHE.get((loc, booth_name), {})} for loc, booth_name in booth_list],
+        columns=['location', 'booth', 'time', 'temp_c', 'co2_ppm']
+    )
+    latest_df[['temp_c', 'co2_ppm']] = latest_df[['temp_c', 'co2_ppm']].apply(pd.to_numeric, errors='coerce')
+    latest_df['time'] = pd.to_datetime(latest_df['time'], errors='coerce')
+
+    co2_alert = latest_df['co2_ppm'] > 1000
+    temp_alert = latest_df['temp_c'] > 25
+    location_summaries = (co2_alert | temp_alert).groupby(latest_df['location']).sum().reindex(locations, fill_value=0).astype(int).to_dict()
+
+    # 1. Logic for Active Alerts Log
+    active_alerts = [f"High CO₂ in {row.location}, {row.booth}: {int(row.co2_ppm)} ppm" for row in latest_df[co2_alert].itertuples()]
+    active_alerts += [f"High Temp in {row.location}, {row.booth}: {round(row.temp_c, 2)}°C" for row in latest_df[temp_alert].itertuples()]
 
     # 2. Logic for System Status Panel
-    last_seen = latest.get('time')
-    if last_seen:
-        time_diff = datetime.now() - last_seen
-        status = "Online"
-        if time_diff > timedelta(hours=1):
-            status = "Offline"
-        system_status.append({'location': loc, 'booth': booth_name, 'last_seen': last_seen.strftime('%Y-%m-%d %H:%M'), 'status': status})
-    else:
-        system_status.append({'location': loc, 'booth': booth_name, 'last_seen': 'Never', 'status': 'Offline'})
+    offline = latest_df['time'].isna() | ((datetime.now() - latest_df['time']) > pd.Timedelta(hours=1))
+    latest_df['status'] = np.where(offline, 'Offline', 'Online')
+    latest_df['last_seen'] = latest_df['time'].dt.strftime('%Y-%m-%d %H:%M').fillna('Never')
+    system_status = latest_df[['location', 'booth', 'last_seen', 'status']].to_dict('records')
 
-        
-    df_spotlight = load_sensor_data('Adelaide', 'Booth A')
+    # Loading refreshes _KPI_CACHE when the spotlight booth has new data
     kpi_data = {}
-    if df_spotlight is not None and not df_spotlight.empty:
-        recent_data = df_spotlight.tail(24)
-        kpi_data = {
-            'temp_labels': recent_data['time'].dt.strftime('%H:%M').tolist(),
-            'temp_values': recent_data['temp_c'].tolist(),
-            'humidity_values': recent_data['humidity_pct'].tolist(),
-            'occupancy_counts': recent_data['pir_state'].value_counts().to_dict()
-        }
-    return render_template('dashboard.html', locations=locations, location_summaries=location_summaries, kpi_data=kpi_data)
+    if load_sensor_data('Adelaide', 'Booth A') is not None:
+        kpi_data = _KPI_CACHE.get(('Adelaide', 'Booth A'), {})
+    return render_template('dashboard.html', locations=locations, location_summaries=location_summaries, kpi_data=kpi_data, active_alerts=active_alerts, system_status=system_status)
 
 @app.route('/location/<loc_name>')
 def location(loc_name):
     if 'username' not in session: return redirect(url_for('login'))
     client_name = session.get('client_name')
-    user_locations = get_locations(df_clients, client_name if session.get('role') == 'client' else None)
+    user_locations = get_locations(client_name if session.get('role') == 'client' else None)
     
     if session['role'] == 'client' and loc_name not in user_locations:
         return "Access Denied", 403
     
-    booths = df_clients[df_clients['location'] == loc_name]['booth'].unique().tolist()
+    booths = loc_to_booths.get(loc_name, [])
     return render_template('location.html', locations=user_locations, location_name=loc_name, booths=booths)
 
 @app.route('/booth/<loc_name>/<booth_name>')
 def booth(loc_name, booth_name):
     if 'username' not in session: return redirect(url_for('login'))
     
+    client_name = session.get('client_name')
+    if session['role'] == 'client':
+        if booth_name not in client_loc_to_booths.get((client_name, loc_name), set()):
+            return "Access Denied", 403
+
     df_booth_data = load_sensor_data(loc_name, booth_name)
     has_data = df_booth_data is not None and not df_booth_data.empty
 
@@ -206,32 +562,29 @@ def booth(loc_name, booth_name):
 
     if has_data:
         reading = df_booth_data.iloc[-1].to_dict()
+        # float32 readings would render as 26.299999237 and aren't JSON serializable
+        for col in ['temp_c', 'humidity_pct']:
+            reading[col] = round(float(reading[col]), 2)
+        # CO2 is stored as float32 but shown in whole ppm, as it was when parsed as int
+        co2_val = reading['co2_ppm']
+        reading['co2_ppm'] = float('nan') if pd.isna(co2_val) else int(round(float(co2_val)))
         
         # --- SAFE HISTORICAL CONTEXT CALCULATION ---
-        # Filter for data older than 24 hours
-        yesterday_data = df_booth_data[df_booth_data['time'] < (datetime.now() - timedelta(days=1))]
+        # Filter for data older than 24 hours. The frame is sorted by time, so
+        # those rows are a prefix located by binary search.
+        cutoff = np.datetime64(datetime.now() - timedelta(days=1))
+        yesterday_data = df_booth_data.iloc[:df_booth_data['time'].values.searchsorted(cutoff)]
         
         # Only calculate changes if there is historical data to compare against
         if not yesterday_data.empty:
             if 'temp_c' in reading and reading['temp_c'] is not None:
-                historical_context['temp_change'] = reading['temp_c'] - yesterday_data['temp_c'].mean()
+                historical_context['temp_change'] = float(reading['temp_c'] - yesterday_data['temp_c'].mean())
             if 'humidity_pct' in reading and reading['humidity_pct'] is not None:
-                historical_context['hum_change'] = reading['humidity_pct'] - yesterday_data['humidity_pct'].mean()
+                historical_context['hum_change'] = float(reading['humidity_pct'] - yesterday_data['humidity_pct'].mean())
 
-    client_name = session.get('client_name')
-    if session['role'] == 'client':
-        allowed_booths = df_clients[(df_clients['client_name'] == client_name) & (df_clients['location'] == loc_name)]
-        if booth_name not in allowed_booths['booth'].tolist():
-            return "Access Denied", 403
-            
-    df_booth_data = load_sensor_data(loc_name, booth_name)
-    has_data = df_booth_data is not None and not df_booth_data.empty
-    
-    reading = df_booth_data.iloc[-1].to_dict() if has_data else {}
-    
     booth_thresholds = {'temp_c': {'low': 18, 'high': 24}, 'humidity_pct': {'low': 40, 'high': 60}, 'co2_ppm': {'low': 0, 'high': 1000}, 'voc': {'low': 0, 'high': 100}}
     
-    locations = get_locations(df_clients, client_name if session.get('role') == 'client' else None)
+    locations = get_locations(client_name if session.get('role') == 'client' else None)
     
     return render_template('booth.html', reading=reading, historical_context=historical_context , locations=locations, loc_name=loc_name, booth_name=booth_name, thresholds=booth_thresholds, has_data=has_data)
 
@@ -241,8 +594,7 @@ def analytics(loc_name, booth_name, metric):
     
     client_name = session.get('client_name')
     if session['role'] == 'client':
-        allowed_booths = df_clients[(df_clients['client_name'] == client_name) & (df_clients['location'] == loc_name)]
-        if booth_name not in allowed_booths['booth'].tolist():
+        if booth_name not in client_loc_to_booths.get((client_name, loc_name), set()):
             return "Access Denied", 403
 
     df_booth_data = load_sensor_data(loc_name, booth_name)
@@ -255,15 +607,25 @@ def analytics(loc_name, booth_name, metric):
 
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
-    if start_date_str:
-        df_booth_data = df_booth_data[df_booth_data['time'] >= pd.to_datetime(start_date_str)]
-    if end_date_str:
-        df_booth_data = df_booth_data[df_booth_data['time'] <= pd.to_datetime(end_date_str)]
+    if start_date_str or end_date_str:
+        # The frame is sorted by time (NaT last), so a date range is one contiguous
+        # slice located by binary search instead of two full-column masks.
+        times = df_booth_data['time'].values
+        start = times.searchsorted(pd.to_datetime(start_date_str).to_datetime64(), side='left') if start_date_str else 0
+        if end_date_str:
+            end = times.searchsorted(pd.to_datetime(end_date_str).to_datetime64(), side='right')
+        else:
+            end = len(times) - np.isnat(times).sum()
+        df_booth_data = df_booth_data.iloc[start:end]
 
     chart_data = df_booth_data if (start_date_str or end_date_str) else df_booth_data.tail(100)
 
     labels = chart_data['time'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
-    values = chart_data[metric].tolist()
+    values = chart_data[metric]
+    if values.dtype == 'float32':
+        # Widen before rounding so float32 storage doesn't leak 23.899999618... into the chart
+        values = values.astype('float64').round(2)
+    values = values.tolist()
 
     metric_titles = {
         'temp_c': 'Temperature', 'humidity_pct': 'Humidity', 'co2_ppm': 'CO₂ Levels',
@@ -282,5 +644,12 @@ def analytics(loc_name, booth_name, metric):
                            end_date=end_date_str)
 
 # --- Run the Application ---
+# For production use wsgi.py under gunicorn; see README.md.
 if __name__ == '__main__':
-    app.run(debug=True)
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    # The debug reloader also runs this block in its watcher process; only the
+    # serving process needs warm caches.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_caches()
+        start_cache_refresher()
+    app.run(debug=debug)
@@ -0,0 +1,53 @@
+"""
+One-off migration: compacts the per-booth CSVs in data/ into a single Parquet
+dataset partitioned by location and booth (data_parquet/location=.../booth=...).
+
+The whole estate can then be queried in one multithreaded scan, e.g. with DuckDB:
+
+    SELECT location, booth, arg_max(temp_c, time) AS temp, arg_max(co2_ppm, time) AS co2, max(time) AS last
+    FROM read_parquet('data_parquet/**/*.parquet', hive_partitioning = true)
+    GROUP BY location, booth
+
+Re-running the script replaces the partitions it writes.
+"""
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATASET_DIR = 'data_parquet'
+
+def main():
+    try:
+        df_clients = pd.read_csv('clients.csv')
+    except FileNotFoundError:
+        print("FATAL ERROR: 'clients.csv' not found. Please run this from the project folder.")
+        return
+
+    frames = []
+    for loc_name, booth_name in df_clients[['location', 'booth']].drop_duplicates().itertuples(index=False):
+        # Same naming scheme as sensor_filepath() in the app
+        filepath = os.path.join('data', f"{loc_name.replace(' ', '')}_{booth_name.replace(' ', '')}.csv")
+        if not os.path.exists(filepath):
+            continue
+        df = pd.read_csv(filepath)
+        for col in ['temp_c', 'humidity_pct', 'co2_ppm']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        if 'time' in df.columns:
+            df['time'] = pd.to_datetime(df['time'], errors='coerce')
+        df['location'] = loc_name
+        df['booth'] = booth_name
+        frames.append(df)
+        print(f"Read {len(df)} rows from {filepath}")
+
+    if not frames:
+        print("No booth CSVs found in 'data/'.")
+        return
+
+    table = pa.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False)
+    pq.write_to_dataset(table, DATASET_DIR, partition_cols=['location', 'booth'], existing_data_behavior='delete_matching')
+    print(f"Wrote {table.num_rows} rows to '{DATASET_DIR}/'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+workers = 4
+worker_class = 'gthread'
+threads = 8
+# Import wsgi.py (and warm the caches) once in the master before forking
+preload_app = True
+
+def post_fork(server, worker):
+    import dashboard_main
+
+    # Don't let workers share the master's keep-alive connection to Google.
+    # gspread 5 keeps the requests session on the client, gspread 6 on its http_client.
+    client = dashboard_main.gspread_client
+    session = getattr(client, 'session', None) or getattr(getattr(client, 'http_client', None), 'session', None)
+    if session is not None:
+        session.close()
+
+    # Timer threads don't survive a fork, so each worker runs its own refresher
+    dashboard_main.start_cache_refresher()
@@ -0,0 +1,17 @@
+# WSGI entry point for production: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Caches are warmed at import time. With preload_app the gunicorn master does
+# this once before forking, and every worker inherits the loaded frames and
+# lookup tables copy-on-write instead of re-reading them.
+import os
+import sys
+
+# The random fallback key in the app is per process, so with several workers
+# (or without preload_app) sessions would randomly fail to validate.
+if not os.environ.get('FLASK_SECRET_KEY'):
+    print("FATAL ERROR: FLASK_SECRET_KEY must be set when serving through wsgi.py.")
+    sys.exit(1)
+
+from dashboard_main import app, warm_caches
+
+warm_caches()